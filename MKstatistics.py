@@ -4,7 +4,7 @@ Megakaryocyte Statistics Script
 Author: Lilly-Flore CELMA
 
 This script analyzes measurements from a TSV file containing megakaryocyte (MK) data. It generates statistical
-histograms and tables, and combines them into a final PDF report. The analysis includes various parameters such as
+histograms and tables, and writes them into a single PDF report. The analysis includes various parameters such as
 the number of nuclei, area, diameter, circularity, and hematoxylin values.
 
 1. Load Data:
@@ -17,160 +17,181 @@ the number of nuclei, area, diameter, circularity, and hematoxylin values.
 3. Create Tables:
    - Computes and creates tables with summary statistics for MK and nuclei parameters.
 
-4. Combine Histograms and Tables:
-   - Merges the generated histograms and tables into separate PDFs.
+4. Generate Final Report:
+   - Writes the tables followed by the histograms into a single comprehensive PDF report.
 
-5. Generate Final Report:
-   - Combines the histograms and tables PDFs into a single comprehensive report.
+Usage: python MKstatistics.py [measurements.tsv] [output.pdf]
 
 Note: Exception handling is implemented for potential errors during file reading, data processing, and PDF creation.
 """
-import math
+import os
+import sys
+
+import matplotlib
+
+# The report is only written to PDF, so no GUI backend is needed
+matplotlib.use('Agg')
 
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-from PyPDF2 import PdfReader, PdfWriter
+import pyarrow as pa
+import pyarrow.csv as pacsv
 from matplotlib.backends.backend_pdf import PdfPages
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Spacer
-
-########## GET TSV FILE ##########
-
-# Load the TSV file into a pandas DataFrame, specifying the delimiter
-measurements_file_tsv = '/Users/lilly-flore/Desktop/Bachelor_Project/MKProject/measurements.tsv'
+from matplotlib.collections import PatchCollection
+from matplotlib.patches import Rectangle
 
-try:
-    df = pd.read_csv(measurements_file_tsv, delimiter='\t')
-except FileNotFoundError:
-    print(f"Error: The file {measurements_file_tsv} was not found.")
-except pd.errors.EmptyDataError:
-    print(f"Error: The file {measurements_file_tsv} is empty or contains no data.")
-except pd.errors.ParserError:
-    print(f"Error: There was an issue parsing the TSV file {measurements_file_tsv}.")
+# Plot defaults: no grid, no automatic layout and paths simplified down to what is visible at the output resolution
+plt.rcParams.update({'axes.grid': False, 'figure.autolayout': False,
+                     'path.simplify': True, 'path.simplify_threshold': 1.0})
 
+########## GET TSV FILE ##########
 
-########## FILTER LIST ##########
-def filter_list(in_list):
-    """
-    Filters out elements with NaN values from a list.
-
-    Parameters:
-    - list: The input list containing numeric values.
+# Default paths, used when none are given on the command line
+default_measurements_file_tsv = '/Users/lilly-flore/Desktop/Bachelor_Project/MKProject/measurements.tsv'
+default_output_path = '/Users/lilly-flore/Desktop/MK_statistics.pdf'
 
-    Returns:
-    list: A new list with NaN values removed.
-    """
-    new_list = [e for e in in_list if not math.isnan(e)]
+columns_to_extract = ['Image', 'Object ID', 'Name', 'Number of nuclei',
+                      'Area µm^2', 'Area Ratio %', 'Nucleus Area µm^2: Mean',
+                      'Min diameter µm', 'Nucleus diameter µm: Mean Min', 'Diameter Ratio %: Min',
+                      'Max diameter µm', 'Nucleus diameter µm: Mean Max', 'Diameter Ratio %: Max',
+                      'Circularity', 'Nucleus Circularity µm: Mean', 'Circularity Ratio %',
+                      'Hematoxylin: Mean', 'Hematoxylin: Min', 'Hematoxylin: Max',
+                      'Nucleus Hematoxylin: Max', 'Nucleus Hematoxylin: Min', 'Nucleus Hematoxylin: Mean',
+                      'Nucleus Hematoxylin: Std.Dev.'
+                      ]
+string_columns = columns_to_extract[:3]
+numeric_columns = columns_to_extract[3:]
 
-    return new_list
+# Cells read as missing values, the same as the pandas.read_csv defaults
+null_values = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+               '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
 
 
 ########## CREATE SCATTER PLOT ##########
-def scatter_plot(in_list_of_maps, x_label, y_label):
+def scatter_plot(in_df, x_label, y_label, ax=None, rasterize_min_points=2000):
     """
-    Create a scatter plot based on a list of maps, where each map represents data points for a specific image.
+    Create a scatter plot based on a DataFrame of measurements, with one series of points for each image.
 
     Parameters:
-    - list_of_maps (list of dict): A list of dictionaries, each containing data for a specific image.
-    - x_label (str): The label for the x-axis, specifying the key in each map corresponding to the x-axis values.
-    - y_label (str): The label for the y-axis, specifying the key in each map corresponding to the y-axis values.
+    - in_df (pandas.DataFrame): The measurements, with an 'Image' column naming the image of each row.
+    - x_label (str): The label for the x-axis, specifying the column corresponding to the x-axis values.
+    - y_label (str): The label for the y-axis, specifying the column corresponding to the y-axis values.
+    - ax (matplotlib.axes.Axes, optional): Axes to clear and draw into instead of creating a new figure.
+      The caller is then responsible for closing its figure.
+    - rasterize_min_points (int): The number of points from which the markers are embedded in a PDF as a single
+      image rather than as one vector path per marker. Axes, labels and legend stay vector.
 
     Returns:
     - fig (matplotlib.figure.Figure): The matplotlib figure containing the scatter plot.
     """
 
-    fig, ax = plt.subplots()
-    unique_images = set(item['Image'] for item in in_list_of_maps)
+    # Reuse the given axes when there is one
+    if ax is None:
+        fig, ax = plt.subplots()
 
-    # Iterate over each unique image and add a scatter plot
-    for image in unique_images:
-        filtered_maps = [item for item in in_list_of_maps if item['Image'] == image]
-        x_values = [item[x_label] for item in filtered_maps]
-        y_values = [item[y_label] for item in filtered_maps]
+        # Explicitly close the figure to release memory
+        plt.close(fig)
+    else:
+        fig = ax.figure
+        ax.clear()
 
-        ax.scatter(x_values, y_values, label=image.split('_')[0])
+    rasterized = len(in_df) >= rasterize_min_points
+
+    # Add a scatter plot for each image, in order of first appearance
+    for image, image_df in in_df.groupby('Image', sort=False):
+        ax.scatter(image_df[x_label], image_df[y_label], label=image.split('_')[0], rasterized=rasterized)
 
     ax.set_xlabel(x_label)
     ax.set_ylabel(y_label)
     ax.set_title(f"{x_label} vs {y_label}")
     ax.legend()
 
-    # Explicitly close the figure to release memory
-    plt.close(fig)
-
     return fig
 
 
 ########## CREATE STATISTICS HISTOGRAM ##########
-def extract_unit_scientific_notation(number):
+def compute_num_bins(in_array, max_bins=250):
     """
-    Extracts the unit from a number in scientific notation.
+    Computes the number of histogram bins using the Freedman-Diaconis rule.
+    When the rule degenerates to a single bin (zero interquartile range, e.g. tiny or mostly constant data),
+    the Sturges rule is used instead, as NumPy's 'auto' estimator does.
+    Whole-number data (e.g. the number of nuclei) gets one unit-wide bin per integer, centred on it, instead.
+
+    The bin width is computed here rather than with np.histogram_bin_edges(bins='fd'), so that the number of bins
+    is capped before any edge is built: a tight interquartile range with one far outlier would otherwise allocate
+    a huge edge array.
 
     Parameters:
-    - number (float): The number in scientific notation.
+    - in_array (numpy.ndarray): The array of data, without NaN values.
+    - max_bins (int): The maximum number of bins returned.
 
     Returns:
-    float: The extracted unit.
+    tuple: The number of bins and the (min, max) range they span.
     """
-    # Use scientific notation format with 2 decimal places
-    scientific_notation = "{:e}".format(number)
+    if in_array.size == 0:
+        return 1, (0.0, 1.0)
+
+    min_value, max_value = in_array.min(), in_array.max()
+    if min_value == max_value:
+        return 1, (min_value - 0.5, max_value + 0.5)
 
-    # Extract the unit (part after "e")
-    after_e_part = scientific_notation.split('e')[0]
+    # Counts are parsed as float64, so integer data is detected from its values rather than from its dtype
+    if np.all(in_array == np.round(in_array)):
+        num_bins = int(min(max_value - min_value + 1, max_bins))
+        return num_bins, (min_value - 0.5, max_value + 0.5)
 
-    return float(after_e_part)
+    # Freedman-Diaconis bin width, with the number of bins capped before it is converted to an int
+    value_range = max_value - min_value
+    q75, q25 = np.percentile(in_array, [75, 25])
+    bin_width = 2.0 * (q75 - q25) * in_array.size ** (-1.0 / 3.0)
+    num_bins = int(min(np.ceil(value_range / bin_width), max_bins)) if bin_width > 0 else 1
 
+    # Sturges fallback
+    if num_bins <= 1:
+        num_bins = int(np.ceil(np.log2(in_array.size) + 1.0))
 
-def plot_histogram(in_list, x_label, y_label):
+    return min(num_bins, max_bins), (min_value, max_value)
+
+
+def plot_histogram(in_array, x_label, y_label, ax=None):
     """
-    Plots a histogram for a given list of data.
+    Plots a histogram for a given array of data.
 
     Parameters:
-    - list (list): The list of data.
+    - in_array (array-like): The data, without NaN values. It is converted once to a float64 NumPy array.
     - x_label (str): The label for the x-axis.
     - y_label (str): The label for the y-axis.
+    - ax (matplotlib.axes.Axes, optional): Axes to clear and draw into instead of creating a new figure.
+      The caller is then responsible for closing its figure.
 
     Returns:
-    matplotlib.figure.Figure: The matplotlib figure object.
+    matplotlib.figure.Figure: The matplotlib figure object, or None if the histogram could not be plotted.
     """
 
     try:
-        # Calculate the bin edges and the number of occurrences in each bin
-        min_value = min(in_list)
-        max_value = max(in_list)
-        gap = abs(max_value) - abs(min_value)
-
-        if 0.01 <= gap <= 0.01:
-            bin_width = 0.001
-        elif 0.01 < gap <= 0.5:
-            bin_width = 0.005
-        elif 0.1 < gap <= 2:
-            bin_width = 0.05
-        elif 2 < gap <= 20:
-            bin_width = 1
-        elif 20 < gap <= 100:
-            bin_width = 5
-        elif 100 < gap <= 1000:
-            bin_width = 10
-        elif 1000 < gap <= 10000:
-            bin_width = 50
+        # Display the histogram, reusing the given axes when there is one.
+        # They are cleared first, so that a failure below never leaves the previous histogram on them.
+        if ax is None:
+            fig, ax = plt.subplots()
+
+            # Explicitly close the figure to release memory
+            plt.close(fig)
         else:
-            bin_width = 1
+            fig = ax.figure
+            ax.clear()
 
-        num_bins = math.ceil(gap / bin_width)
+        # No copy is made when the data already is a float64 array
+        in_array = np.asarray(in_array, dtype=np.float64)
 
-        # Display the histogram
-        fig, ax = plt.subplots()
-        n, bins, patches = ax.hist(in_list, bins=num_bins, color='grey', edgecolor='darkgrey')
-        ax.set_title(f"{x_label}{' distribution'}")
+        # Choose the number of bins with the Freedman-Diaconis rule
+        num_bins, bin_range = compute_num_bins(in_array)
+
+        counts, edges = np.histogram(in_array, bins=num_bins, range=bin_range)
+        n, bins, patches = ax.hist(edges[:-1], bins=edges, weights=counts, color='grey', edgecolor='darkgrey')
+        ax.set_title(x_label + ' distribution')
         ax.set_xlabel(x_label)
         ax.set_ylabel(y_label)
-        ax.grid(False)
-
-        # Explicitly close the figure to release memory
-        plt.close(fig)
 
         return fig
 
@@ -181,9 +202,17 @@ def plot_histogram(in_list, x_label, y_label):
 
 ########## CREATE TABLE ##########
 
+# Table style: bold header on light grey, values on white, dim grey grid
+table_header_colour = 'lightgrey'
+table_value_colour = 'white'
+table_grid_colour = 'dimgrey'
+table_header_text_style = {'ha': 'center', 'va': 'center', 'fontsize': 9, 'fontweight': 'bold'}
+table_value_text_style = {'ha': 'left', 'va': 'center', 'fontsize': 9}
+
+
 def create_table(MK_name, nuc_name, MK_value, nuc_value):
     """
-    Creates a table with specified values and styling.
+    Creates the rows of a table with specified values.
 
     Parameters:
     - MK_name (str): The name for the first row.
@@ -192,261 +221,230 @@ def create_table(MK_name, nuc_name, MK_value, nuc_value):
     - nuc_value (str): The value for the second row.
 
     Returns:
-    reportlab.platypus.tables.Table: The reportlab table object.
+    list: The table rows, starting with the header row.
     """
 
-    try:
-        data = [
-            ["Type", "Value"],
-            [MK_name, MK_value],
-            [nuc_name, nuc_value]
-        ]
-
-        # Create a table with the data
-        table = Table(data, colWidths=150, rowHeights=20)
-
-        # Style the table
-        style = TableStyle([('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-                            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-                            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-                            ('ALIGN', (0, 1), (-1, -1), 'LEFT'),
-                            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                            ('BOTTOMPADDING', (0, 0), (-1, 0), 3),
-                            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                            ('GRID', (0, 0), (-1, -1), 1, colors.dimgrey),
-                            ])
-
-        table.setStyle(style)
-        return table
+    data = [
+        ["Type", "Value"],
+        [MK_name, MK_value],
+        [nuc_name, nuc_value]
+    ]
 
-    except Exception as e:
-        print(f"Error: An unexpected error occurred in create_table. {e}")
+    return data
 
 
-######### CREATE PDF ###########
-def create_pdf_with_tables(file_path, in_tables):
+def plot_tables(in_tables):
     """
-    Creates a PDF document with multiple tables.
+    Draws tables on letter-sized pages, stacked from the top of each page.
+    Pages are yielded one at a time so that only one of them is kept in memory.
 
     Parameters:
-    - file_path (str): The path to the PDF file.
-    - tables (list): The list of reportlab table objects.
-    """
-
-    try:
-        # Create a PDF document
-        in_pdf = SimpleDocTemplate(file_path, pagesize=letter)
-
-        # Build the content with tables and space between them
-        content = []
-        for table in in_tables:
-            content.append(table)
-
-            # Add space (Spacer) between tables
-            content.append(Spacer(1, 12))
+    - in_tables (list): The list of table rows returned by create_table.
 
-        # Build the PDF document
-        in_pdf.build(content)
-
-    except Exception as e:
-        print(f"Error: An unexpected error occurred in create_pdf_with_tables. {e}")
-
-
-def merge_pdfs(pdf1_path, pdf2_path, o_path):
+    Yields:
+    matplotlib.figure.Figure: The matplotlib figure object of each page.
     """
-    Merges two PDF files into one.
 
-    Parameters:
-    - pdf1_path (str): The path to the first PDF file.
-    - pdf2_path (str): The path to the second PDF file.
-    - o_path (str): The path to the output PDF file.
-    """
     try:
-        with open(pdf1_path, 'rb') as file1, open(pdf2_path, 'rb') as file2:
-            pdf_reader1 = PdfReader(file1)
-            pdf_reader2 = PdfReader(file2)
-
-            # Create a PDF writer
-            pdf_writer = PdfWriter()
-
-            # Add pages from the first PDF
-            for page_num in range(len(pdf_reader1.pages)):
-                page = pdf_reader1.pages[page_num]
-                pdf_writer.add_page(page)
+        # Page layout in points: letter page with one inch margins
+        page_width, page_height, margin = 612, 792, 72
+        col_width, row_height, spacing, padding = 150, 20, 12, 6
+
+        table_step = 3 * row_height + spacing
+        tables_per_page = (page_height - 2 * margin + spacing) // table_step
+
+        for first in range(0, len(in_tables), tables_per_page):
+            fig = plt.figure(figsize=(page_width / 72, page_height / 72))
+            ax = fig.add_axes((0, 0, 1, 1))
+            ax.set_axis_off()
+
+            # Axes coordinates are points from the bottom left corner of the page
+            ax.set_xlim(0, page_width)
+            ax.set_ylim(0, page_height)
+
+            top = page_height - margin
+            left = page_width / 2 - col_width
+            cells = []
+            cell_colours = []
+            for data in in_tables[first:first + tables_per_page]:
+                for row_index, row in enumerate(data):
+                    y = top - (row_index + 1) * row_height
+                    for col_index, value in enumerate(row):
+                        x = left + col_index * col_width
+                        cells.append(Rectangle((x, y), col_width, row_height))
+                        if row_index == 0:
+                            cell_colours.append(table_header_colour)
+                            ax.text(x + col_width / 2, y + row_height / 2, value, **table_header_text_style)
+                        else:
+                            cell_colours.append(table_value_colour)
+                            ax.text(x + padding, y + row_height / 2, value, **table_value_text_style)
+
+                top -= table_step
+
+            # Draw the cells of all the tables on the page as a single collection
+            ax.add_collection(PatchCollection(cells, facecolors=cell_colours, edgecolors=table_grid_colour,
+                                              linewidths=1))
+
+            # Explicitly close the figure to release memory
+            plt.close(fig)
+            yield fig
 
-            # Add pages from the second PDF
-            for page_num in range(len(pdf_reader2.pages)):
-                page = pdf_reader2.pages[page_num]
-                pdf_writer.add_page(page)
-
-            # Write the combined PDF to the output file
-            with open(o_path, 'wb') as output_file:
-                pdf_writer.write(output_file)
-
-    except FileNotFoundError:
-        print(f"Error: One or both of the PDF files {pdf1_path} and {pdf2_path} not found.")
     except Exception as e:
-        print(f"Error: An unexpected error occurred during PDF merge. {e}")
+        print(f"Error: An unexpected error occurred in plot_tables. {e}")
 
 
 ########## INITIATE VALUES ##########
 
-# Create a list to store the maps for each row
-list_of_maps = []
-
-# Iterate over each row in the DataFrame
-for index, row in df.iterrows():
-    # Convert the row to a dictionary and append it to the list
-    row_map = row.to_dict()
-    list_of_maps.append(row_map)
+# Histograms to draw, as (column, x label, y label)
+y_label_MK = 'Number of Megakaryocytes'
+y_label_nuclei = 'Number of Nuclei'
+histogram_specs = [
+    ('Number of nuclei', 'Number of nuclei', y_label_MK),
+
+    ('Area µm^2', 'MK Area µm^2', y_label_MK),
+    ('Nucleus Area µm^2: Mean', 'Nucleus Area µm^2', y_label_nuclei),
+    ('Area Ratio %', 'Area Ratio (sum of all the areas of a cell\'s nuclei / cell area) %', y_label_MK),
+
+    ('Max diameter µm', 'MK max diameter µm', y_label_MK),
+    ('Nucleus diameter µm: Mean Max', 'Nucleus mean max diameter µm', y_label_nuclei),
+    ('Diameter Ratio %: Max', 'Max diameter Ratio %', y_label_MK),
+
+    ('Min diameter µm', 'MK min diameter µm', y_label_MK),
+    ('Nucleus diameter µm: Mean Min', 'Nucleus mean min diameter µm', y_label_nuclei),
+    ('Diameter Ratio %: Min', 'Min diameter Ratio %', y_label_MK),
+
+    ('Circularity', 'MK circularity', y_label_MK),
+    ('Nucleus Circularity µm: Mean', 'Nucleus mean circularity', y_label_nuclei),
+    ('Circularity Ratio %', 'Circularity Ratio %', y_label_MK),
+
+    ('Hematoxylin: Min', 'MK Hematoxylin: Min', y_label_MK),
+    ('Hematoxylin: Max', 'MK Hematoxylin: Max', y_label_MK),
+    ('Hematoxylin: Mean', 'MK Hematoxylin: Mean', y_label_MK),
+
+    ('Nucleus Hematoxylin: Min', 'Nucleus Hematoxylin: Min', y_label_nuclei),
+    ('Nucleus Hematoxylin: Max', 'Nucleus Hematoxylin: Max', y_label_nuclei),
+    ('Nucleus Hematoxylin: Mean', 'Nucleus Hematoxylin: Mean', y_label_nuclei),
+    ('Nucleus Hematoxylin: Std.Dev.', 'Nucleus Hematoxylin: Std.Dev.', y_label_nuclei),
+]
+
+# Columns whose mean and standard deviation are shown in the tables, grouped by unit
+area_columns = ['Area µm^2', 'Nucleus Area µm^2: Mean']
+diameter_columns = ['Max diameter µm', 'Nucleus diameter µm: Mean Max',
+                    'Min diameter µm', 'Nucleus diameter µm: Mean Min']
+stat_columns = area_columns + diameter_columns + ['Circularity', 'Nucleus Circularity µm: Mean',
+                                                  'Hematoxylin: Mean', 'Nucleus Hematoxylin: Mean',
+                                                  'Nucleus Hematoxylin: Std.Dev.']
+
+# Tables to create, as (MK name, nucleus name, (statistic, MK column), (statistic, nucleus column))
+table_specs = [
+    ('MK mean area', 'Nucleus mean area', ('mean', 'Area µm^2'), ('mean', 'Nucleus Area µm^2: Mean')),
+    ('MK area std', 'Nucleus area std', ('std', 'Area µm^2'), ('std', 'Nucleus Area µm^2: Mean')),
+
+    ('MK mean max diameter', 'Nucleus mean max diameter',
+     ('mean', 'Max diameter µm'), ('mean', 'Nucleus diameter µm: Mean Max')),
+    ('MK max diameter std', 'Nucleus max diameter std',
+     ('std', 'Max diameter µm'), ('std', 'Nucleus diameter µm: Mean Max')),
+
+    ('MK mean min diameter', 'Nucleus mean min diameter',
+     ('mean', 'Min diameter µm'), ('mean', 'Nucleus diameter µm: Mean Min')),
+    ('MK min diameter std', 'Nucleus min diameter std',
+     ('std', 'Min diameter µm'), ('std', 'Nucleus diameter µm: Mean Min')),
+
+    ('MK mean circularity', 'Nucleus mean circularity', ('mean', 'Circularity'), ('mean', 'Nucleus Circularity µm: Mean')),
+    ('MK circularity std', 'Nucleus circularity std', ('std', 'Circularity'), ('std', 'Nucleus Circularity µm: Mean')),
+
+    ('MK mean hematoxylin', 'Nucleus mean hematoxylin',
+     ('mean', 'Hematoxylin: Mean'), ('mean', 'Nucleus Hematoxylin: Mean')),
+    ('MK hematoxylin std', 'Nucleus hematoxylin std',
+     ('std', 'Hematoxylin: Mean'), ('mean', 'Nucleus Hematoxylin: Std.Dev.')),
+]
+
+
+########## MAIN ##########
+def main():
+    """
+    Loads the measurements, computes the statistics and writes the PDF report.
 
-columns_to_extract = ['Image', 'Object ID', 'Name', 'Number of nuclei',
-                      'Area µm^2', 'Area Ratio %', 'Nucleus Area µm^2: Mean',
-                      'Min diameter µm', 'Nucleus diameter µm: Mean Min', 'Diameter Ratio %: Min',
-                      'Max diameter µm', 'Nucleus diameter µm: Mean Max', 'Diameter Ratio %: Max',
-                      'Circularity', 'Nucleus Circularity µm: Mean', 'Circularity Ratio %',
-                      'Hematoxylin: Mean', 'Hematoxylin: Min', 'Hematoxylin: Max',
-                      'Nucleus Hematoxylin: Max', 'Nucleus Hematoxylin: Min', 'Nucleus Hematoxylin: Mean',
-                      'Nucleus Hematoxylin: Std.Dev.'
-                      ]
+    The measurements TSV file and the output PDF path can be given as the first and second command line arguments.
+    """
+    measurements_file_tsv = sys.argv[1] if len(sys.argv) > 1 else default_measurements_file_tsv
+    output_path = sys.argv[2] if len(sys.argv) > 2 else default_output_path
 
-# Creation of lists
-name_list = df['Name'].tolist()
-num_nuclei_list = filter_list(df['Number of nuclei'].tolist())
-
-area_list = filter_list(df['Area µm^2'].tolist())
-nuc_area_list = filter_list(df['Nucleus Area µm^2: Mean'].tolist())
-area_ratio_list = filter_list(df['Area Ratio %'].tolist())
-
-max_diameter_list = filter_list(df['Max diameter µm'].tolist())
-nuc_max_diam_list = filter_list(df['Nucleus diameter µm: Mean Max'].tolist())
-max_diam_ratio_list = filter_list(df['Diameter Ratio %: Max'].tolist())
-
-min_diameter_list = filter_list(df['Min diameter µm'].tolist())
-nuc_min_diam_list = filter_list(df['Nucleus diameter µm: Mean Min'].tolist())
-min_diam_ratio_list = filter_list(df['Diameter Ratio %: Min'].tolist())
-
-circularity_list = filter_list(df['Circularity'].tolist())
-nuc_circ_list = filter_list(df['Nucleus Circularity µm: Mean'].tolist())
-circ_ratio_list = filter_list(df['Circularity Ratio %'].tolist())
-
-min_hema_list = filter_list(df['Hematoxylin: Min'].tolist())
-max_hema_list = filter_list(df['Hematoxylin: Max'].tolist())
-mean_hema_list = filter_list(df['Hematoxylin: Mean'].tolist())
-nuc_min_hema_list = filter_list(df['Nucleus Hematoxylin: Min'].tolist())
-nuc_max_hema_list = filter_list(df['Nucleus Hematoxylin: Max'].tolist())
-nuc_mean_hema_list = filter_list(df['Nucleus Hematoxylin: Mean'].tolist())
-nuc_std_hema_list = filter_list(df['Nucleus Hematoxylin: Std.Dev.'].tolist())
-
-# Create pdf file
-graphs_pdf = "Graphs.pdf"
-with PdfPages(graphs_pdf) as pdf:
-    # Creation of histograms
-    y_label_MK = 'Number of Megakaryocytes'
-    y_label_nuclei = 'Number of Nuclei'
-
-    num_nuclei_fig = plot_histogram(num_nuclei_list, 'Number of nuclei', y_label_MK)
-    pdf.savefig(num_nuclei_fig)
-
-    areaFig = plot_histogram(area_list, 'MK Area µm^2', y_label_MK)
-    pdf.savefig(areaFig)
-    nuc_area_fig = plot_histogram(nuc_area_list, 'Nucleus Area µm^2', y_label_nuclei)
-    pdf.savefig(nuc_area_fig)
-    area_ratio_fig = plot_histogram(area_ratio_list, 'Area Ratio (sum of all the areas of a cell\'s nuclei / cell area) %', y_label_MK)
-    pdf.savefig(area_ratio_fig)
-
-    max_diam_fig = plot_histogram(max_diameter_list, 'MK max diameter µm', y_label_MK)
-    pdf.savefig(max_diam_fig)
-    nuc_max_diam_fig = plot_histogram(nuc_max_diam_list, 'Nucleus mean max diameter µm', y_label_nuclei)
-    pdf.savefig(nuc_max_diam_fig)
-    max_diam_ratio_fig = plot_histogram(max_diam_ratio_list, 'Max diameter Ratio %', y_label_MK)
-    pdf.savefig(max_diam_ratio_fig)
-
-    min_diam_fig = plot_histogram(min_diameter_list, 'MK min diameter µm', y_label_MK)
-    pdf.savefig(min_diam_fig)
-    nuc_min_diam_fig = plot_histogram(nuc_min_diam_list, 'Nucleus mean min diameter µm', y_label_nuclei)
-    pdf.savefig(nuc_min_diam_fig)
-    min_diam_ratio_fig = plot_histogram(min_diam_ratio_list, 'Min diameter Ratio %', y_label_MK)
-    pdf.savefig(min_diam_ratio_fig)
-
-    circularity_fig = plot_histogram(circularity_list, 'MK circularity', y_label_MK)
-    pdf.savefig(circularity_fig)
-    nuc_circ_fig = plot_histogram(nuc_circ_list, 'Nucleus mean circularity', y_label_nuclei)
-    pdf.savefig(nuc_circ_fig)
-    circ_ratio_fig = plot_histogram(circ_ratio_list, 'Circularity Ratio %', y_label_MK)
-    pdf.savefig(circ_ratio_fig)
-
-    min_hema_fig = plot_histogram(min_hema_list, 'MK Hematoxylin: Min', y_label_MK)
-    pdf.savefig(min_hema_fig)
-    max_hema_fig = plot_histogram(max_hema_list, 'MK Hematoxylin: Max', y_label_MK)
-    pdf.savefig(max_hema_fig)
-    mean_hema_fig = plot_histogram(mean_hema_list, 'MK Hematoxylin: Mean', y_label_MK)
-    pdf.savefig(mean_hema_fig)
-
-    nuc_min_hema_fig = plot_histogram(nuc_min_hema_list, 'Nucleus Hematoxylin: Min', y_label_nuclei)
-    pdf.savefig(nuc_min_hema_fig)
-    nuc_max_hema_fig = plot_histogram(nuc_max_hema_list, 'Nucleus Hematoxylin: Max', y_label_nuclei)
-    pdf.savefig(nuc_max_hema_fig)
-    nuc_mean_hema_fig = plot_histogram(nuc_mean_hema_list, 'Nucleus Hematoxylin: Mean', y_label_nuclei)
-    pdf.savefig(nuc_mean_hema_fig)
-    nuc_std_hema_fig = plot_histogram(nuc_std_hema_list, 'Nucleus Hematoxylin: Std.Dev.', y_label_nuclei)
-    pdf.savefig(nuc_std_hema_fig)
-
-    # Creation of scatter plots
-    area_circ_scatter = scatter_plot(list_of_maps, 'Area µm^2', 'Circularity')
-    pdf.savefig(area_circ_scatter)
-
-tables_pdf = "Tables.pdf"
-tables = []
-
-number_table = create_table('Number of megakaryocytes', 'Number of nuclei', len(name_list), int(sum(num_nuclei_list)))
-tables.append(number_table)
-
-mean_area_table = create_table('MK mean area', 'Nucleus mean area', f"{round(np.mean(area_list), 2)} (µm^2)",
-                               f"{round(np.mean(nuc_area_list), 2)} (µm^2)")
-tables.append(mean_area_table)
-std_area_table = create_table('MK area std', 'Nucleus area std', f"{round(np.std(area_list), 2)} (µm^2)",
-                              f"{round(np.std(nuc_area_list), 2)} (µm^2)")
-tables.append(std_area_table)
-
-mean_max_diam_table = create_table('MK mean max diameter', 'Nucleus mean max diameter',
-                                   f"{round(np.mean(max_diameter_list), 2)} (µm)",
-                                   f"{round(np.mean(nuc_max_diam_list), 2)} (µm)")
-tables.append(mean_max_diam_table)
-std_max_diam_table = create_table('MK max diameter std', 'Nucleus max diameter std',
-                                  f"{round(np.std(max_diameter_list), 2)} (µm)",
-                                  f"{round(np.std(nuc_max_diam_list), 2)} (µm)")
-tables.append(std_max_diam_table)
-
-mean_min_diam_table = create_table('MK mean min diameter', 'Nucleus mean min diameter',
-                                   f"{round(np.mean(min_diameter_list), 2)} (µm)",
-                                   f"{round(np.mean(nuc_min_diam_list), 2)} (µm)")
-tables.append(mean_min_diam_table)
-std_min_diam_table = create_table('MK min diameter std', 'Nucleus min diameter std',
-                                  f"{round(np.std(min_diameter_list), 2)} (µm)",
-                                  f"{round(np.std(nuc_min_diam_list), 2)} (µm)")
-tables.append(std_min_diam_table)
-
-mean_circularity_table = create_table('MK mean circularity', 'Nucleus mean circularity',
-                                      round(np.mean(circularity_list), 2),
-                                      round(np.mean(nuc_circ_list), 2))
-tables.append(mean_circularity_table)
-std_circularity_table = create_table('MK circularity std', 'Nucleus circularity std',
-                                     round(np.std(circularity_list), 2),
-                                     round(np.std(nuc_circ_list), 2))
-tables.append(std_circularity_table)
-
-mean_hema_table = create_table('MK mean hematoxylin', 'Nucleus mean hematoxylin', f"{round(np.mean(mean_hema_list), 2)}",
-                               f"{round(np.mean(nuc_mean_hema_list), 2)}")
-tables.append(mean_hema_table)
-mean_hema_table = create_table('MK hematoxylin std', 'Nucleus hematoxylin std', f"{round(np.std(mean_hema_list), 2)}",
-                               f"{round(np.mean(nuc_std_hema_list), 2)}")
-tables.append(mean_hema_table)
-
-# Create the PDF with multiple tables
-create_pdf_with_tables(tables_pdf, tables)
-
-# Merge graph pdf and table pdf
-output_path = '/Users/lilly-flore/Desktop/MK_statistics.pdf'
-merge_pdfs(tables_pdf, graphs_pdf, output_path)
-print("The pdf has been saved under " + output_path)
+    # Only parse the columns used by the script, with the types of all of them and the null markers given up front.
+    # pyarrow reads the memory-mapped file directly, without copying it through a Python file object.
+    try:
+        if os.path.getsize(measurements_file_tsv) == 0:
+            raise pd.errors.EmptyDataError
+
+        with pa.memory_map(measurements_file_tsv) as measurements_map:
+            measurements_table = pacsv.read_csv(
+                measurements_map,
+                parse_options=pacsv.ParseOptions(delimiter='\t'),
+                convert_options=pacsv.ConvertOptions(
+                    include_columns=columns_to_extract,
+                    column_types={**{column: pa.string() for column in string_columns},
+                                  **{column: pa.float64() for column in numeric_columns}},
+                    null_values=null_values))
+        df = measurements_table.to_pandas()
+    except FileNotFoundError:
+        print(f"Error: The file {measurements_file_tsv} was not found.")
+        sys.exit(1)
+    except pd.errors.EmptyDataError:
+        print(f"Error: The file {measurements_file_tsv} is empty or contains no data.")
+        sys.exit(1)
+    except pa.ArrowInvalid:
+        print(f"Error: There was an issue parsing the TSV file {measurements_file_tsv}.")
+        sys.exit(1)
+    except pa.ArrowKeyError:
+        # Raised by include_columns when a column is not in the header
+        with open(measurements_file_tsv, encoding='utf-8') as measurements_file:
+            header = measurements_file.readline().rstrip('\r\n').split('\t')
+        missing_columns = [column for column in columns_to_extract if column not in header]
+        print(f"Error: The TSV file {measurements_file_tsv} is missing the columns: {', '.join(missing_columns)}.")
+        sys.exit(1)
+
+    # Creation of arrays, one per numeric column, with NaN values removed
+    arrays = {column: df[column].dropna().to_numpy() for column in numeric_columns}
+
+    # Mean and (population) standard deviation of every column shown in the tables, rounded once.
+    # The means are reused for the deviations, so the 2-D block of values is traversed twice in total.
+    stat_values = df[stat_columns].to_numpy()
+    stat_means = np.nanmean(stat_values, axis=0)
+    stat_stds = np.sqrt(np.nanmean((stat_values - stat_means) ** 2, axis=0))
+    stats = pd.DataFrame([stat_means, stat_stds], index=['mean', 'std'], columns=stat_columns).round(2)
+
+    # Format all the table values at once, with their unit
+    stats = stats.astype(str)
+    stats[area_columns] += ' (µm^2)'
+    stats[diameter_columns] += ' (µm)'
+
+    # Creation of tables
+    tables = [create_table('Number of megakaryocytes', 'Number of nuclei',
+                           df.shape[0], int(df['Number of nuclei'].sum()))]
+    for MK_name, nuc_name, MK_stat, nuc_stat in table_specs:
+        tables.append(create_table(MK_name, nuc_name, stats.at[MK_stat], stats.at[nuc_stat]))
+
+    # Create pdf file with the tables followed by the graphs
+    with PdfPages(output_path) as pdf:
+        for tables_fig in plot_tables(tables):
+            pdf.savefig(tables_fig, dpi=100)
+
+        # All the graphs are drawn in turn on the same figure
+        graph_fig, graph_ax = plt.subplots()
+
+        # Creation of histograms
+        for column, x_label, y_label in histogram_specs:
+            if plot_histogram(arrays[column], x_label, y_label, ax=graph_ax) is not None:
+                pdf.savefig(graph_fig, dpi=100)
+
+        # Creation of scatter plots
+        scatter_plot(df, 'Area µm^2', 'Circularity', ax=graph_ax)
+        pdf.savefig(graph_fig, dpi=100)
+
+        plt.close(graph_fig)
+
+    print("The pdf has been saved under " + output_path)
+
+
+if __name__ == '__main__':
+    main()